@@ -1,15 +1,24 @@
+import asyncio
 import feedparser
 import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.base import MIMEBase
-from email import encoders
-from datetime import datetime
+from email.message import EmailMessage
+from datetime import datetime, timedelta
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from html import escape, unescape
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+import io
+import json
 import os
-import requests
-from bs4 import BeautifulSoup
-import time
+import sqlite3
+import zipfile
+import aiohttp
+from aiolimiter import AsyncLimiter
+from bs4 import BeautifulSoup, SoupStrainer
+from selectolax.parser import HTMLParser
+import trafilatura
 import re
+import string
 
 # Configuration
 CONFIG = {
@@ -25,102 +34,339 @@ CONFIG = {
     'sender_password': os.environ.get('SENDER_PASSWORD'),
 }
 
-def fetch_full_article(url):
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+# Per-feed ETag / Last-Modified values persisted between runs so unchanged
+# feeds come back as a cheap HTTP 304 instead of a full download
+STATE_FILE = 'state.json'
+
+def load_state():
+    """Load the persisted feed state (ETag / Last-Modified per feed URL)"""
+    try:
+        with open(STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_state(state):
+    """Write the feed state back atomically"""
+    tmp_file = STATE_FILE + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_file, STATE_FILE)
+
+# URLs already included in a recent digest, so wire stories syndicated by
+# several feeds only appear (and get fetched) once
+SEEN_FILE = 'seen.json'
+SEEN_MAX_AGE_DAYS = 7
+SEEN_MAX_ENTRIES = 5000
+
+def normalize_url(url):
+    """Normalize a URL for dedup: drop utm_* params, fragment, trailing /"""
+    parts = urlparse(url)
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query)
+                       if not k.startswith('utm_')])
+    return urlunparse((parts.scheme, parts.netloc, parts.path.rstrip('/'),
+                       parts.params, query, ''))
+
+def load_seen():
+    """Load recently-seen article URLs, dropping expired entries"""
+    try:
+        with open(SEEN_FILE, 'r', encoding='utf-8') as f:
+            seen = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    cutoff = (datetime.now() - timedelta(days=SEEN_MAX_AGE_DAYS)).isoformat()
+    return {url: ts for url, ts in seen.items() if ts >= cutoff}
+
+def save_seen(seen):
+    """Write the seen-URL set back atomically, newest entries first"""
+    if len(seen) > SEEN_MAX_ENTRIES:
+        newest = sorted(seen.items(), key=lambda item: item[1], reverse=True)
+        seen = dict(newest[:SEEN_MAX_ENTRIES])
+    tmp_file = SEEN_FILE + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(seen, f, indent=2)
+    os.replace(tmp_file, SEEN_FILE)
+
+# On-disk cache of extracted article text so repeat runs don't re-download
+# and re-parse pages we already processed
+CACHE_FILE = 'cache.sqlite'
+
+def open_article_cache():
+    """Open (and create if needed) the article cache database"""
+    conn = sqlite3.connect(CACHE_FILE, check_same_thread=False)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS articles (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            text TEXT,
+            fetched_at TEXT
+        )
+    """)
+    conn.commit()
+    return conn
+
+def cache_lookup(cache, url):
+    """Return the cached (etag, last_modified, text) for a URL, or None"""
+    row = cache.execute(
+        'SELECT etag, last_modified, text FROM articles WHERE url = ?', (url,)
+    ).fetchone()
+    return row
+
+def cache_store(cache, url, etag, last_modified, text):
+    """Insert or refresh a cached article"""
+    cache.execute(
+        'INSERT OR REPLACE INTO articles VALUES (?, ?, ?, ?, ?)',
+        (url, etag, last_modified, text, datetime.now().isoformat())
+    )
+    cache.commit()
+
+# Token-bucket rate limit per host (4 requests/second) so we stay polite
+# without sleeping between every article; waiting on one host never blocks
+# requests to the others
+_host_limiters = defaultdict(lambda: AsyncLimiter(4, 1))
+
+_TAG_RE = re.compile(r'<[^<]+?>')
+
+def strip_html(text):
+    """Strip HTML tags from a snippet of text"""
+    # selectolax's C-level stripper is much faster on full article bodies;
+    # the regex is fine for short feed summaries. Both paths must return
+    # decoded plain text (selectolax decodes entities itself) so the one
+    # escape() downstream doesn't double-encode
+    if len(text) > 2048:
+        return HTMLParser(text).text(separator='\n\n')
+    return unescape(_TAG_RE.sub('', text))
+
+# Only build the elements that can hold article content; everything at the
+# top level of the page (scripts, navs, headers...) is skipped at parse time
+_CONTENT_STRAINER = SoupStrainer(['article', 'main', 'div', 'section'])
+
+# Common article containers, most specific first; combined into one
+# selector so select_one walks the tree a single time
+ARTICLE_SELECTOR = ', '.join([
+    'article',
+    '[role="article"]',
+    '.article-body',
+    '.article-content',
+    '.story-body',
+    '.post-content',
+    '.entry-content',
+    'main',
+])
+
+def extract_article_text(html):
+    """Extract the main article text from a page's HTML"""
+    # trafilatura's lxml-based extractor separates article text from
+    # boilerplate far better than a selector walk, and faster too
+    text_content = trafilatura.extract(
+        html, include_comments=False, favor_precision=True)
+    if text_content and len(text_content) > 200:
+        return text_content
+
+    # Fallback: selector-based extraction for pages trafilatura rejects
+    soup = BeautifulSoup(html, 'lxml', parse_only=_CONTENT_STRAINER)
+
+    # One combined selector so the tree is walked once; returns the
+    # first match in document order
+    article_content = soup.select_one(ARTICLE_SELECTOR)
+
+    if not article_content:
+        # Fallback: everything the strainer kept
+        article_content = soup
+
+    if article_content:
+        # Remove unwanted elements that survived inside the content block
+        for element in article_content.find_all(['script', 'style', 'nav', 'header', 'footer', 'aside', 'iframe']):
+            element.decompose()
+
+        # Extract paragraphs
+        paragraphs = article_content.find_all('p')
+        text_content = '\n\n'.join([p.get_text().strip() for p in paragraphs if p.get_text().strip()])
+
+        # Basic cleanup
+        text_content = text_content.replace('\n\n\n', '\n\n')
+
+        if len(text_content) > 200:  # Only return if we got substantial content
+            return text_content
+
+    return None
+
+# Hard ceiling per article fetch (including the politeness wait) so one
+# hung host can't stretch the whole run; the RSS summary is the fallback
+ARTICLE_FETCH_TIMEOUT = 6.0
+
+# Article prose is always well under this; the cap keeps a page with huge
+# inline SVGs or video blobs from dominating memory and parse time
+MAX_ARTICLE_BYTES = 512 * 1024
+
+async def _read_capped(response, limit=MAX_ARTICLE_BYTES):
+    """Read a response body in chunks, stopping once limit bytes arrive"""
+    body = bytearray()
+    async for chunk in response.content.iter_chunked(16384):
+        body.extend(chunk)
+        if len(body) >= limit:
+            break
+    return bytes(body)
+
+async def fetch_full_article(session, url, cache):
     """Fetch the full article content from a URL"""
     try:
         print(f"    Fetching full article from {url[:50]}...")
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Remove unwanted elements
-        for element in soup.find_all(['script', 'style', 'nav', 'header', 'footer', 'aside', 'iframe']):
-            element.decompose()
-        
-        # Try common article selectors
-        article_content = None
-        selectors = [
-            'article',
-            '[role="article"]',
-            '.article-body',
-            '.article-content',
-            '.story-body',
-            '.post-content',
-            '.entry-content',
-            'main',
-        ]
-        
-        for selector in selectors:
-            article_content = soup.select_one(selector)
-            if article_content:
-                break
-        
-        if not article_content:
-            # Fallback: get main content area
-            article_content = soup.find('body')
-        
-        if article_content:
-            # Extract paragraphs
-            paragraphs = article_content.find_all('p')
-            text_content = '\n\n'.join([p.get_text().strip() for p in paragraphs if p.get_text().strip()])
-            
-            # Basic cleanup
-            text_content = text_content.replace('\n\n\n', '\n\n')
-            
-            if len(text_content) > 200:  # Only return if we got substantial content
-                return text_content
-        
-        return None
-        
+
+        # Ask the server to skip the body if the page hasn't changed since
+        # we cached it
+        cached = await asyncio.to_thread(cache_lookup, cache, url)
+        headers = {}
+        if cached:
+            etag, last_modified, _ = cached
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        async with _host_limiters[urlparse(url).netloc]:
+            # One bounded retry, only for transient failures (5xx or a
+            # dropped connection); everything else falls back to the summary
+            for attempt in (1, 2):
+                try:
+                    async with session.get(url, headers=headers,
+                                           timeout=aiohttp.ClientTimeout(total=10)) as response:
+                        if response.status == 304 and cached:
+                            print(f"    ✓ Article unchanged, using cached text")
+                            return cached[2]
+                        if response.status >= 500 and attempt == 1:
+                            await asyncio.sleep(0.5)
+                            continue
+                        response.raise_for_status()
+                        html = await _read_capped(response)
+                        etag = response.headers.get('ETag')
+                        last_modified = response.headers.get('Last-Modified')
+                    break
+                except aiohttp.ClientConnectionError:
+                    if attempt == 1:
+                        await asyncio.sleep(0.5)
+                        continue
+                    raise
+
+        # HTML parsing is CPU-bound; run it on the executor so other
+        # downloads keep flowing while this page is processed
+        text_content = await asyncio.to_thread(extract_article_text, html)
+        if text_content:
+            await asyncio.to_thread(
+                cache_store, cache, url, etag, last_modified, text_content)
+        return text_content
+
     except Exception as e:
         print(f"    ✗ Error fetching article: {e}")
         return None
 
-def fetch_articles(feed_url, max_articles=5):
+async def fetch_feed(session, feed_cfg, state, cache, seen):
     """Fetch articles from an RSS feed and get full content"""
     try:
-        feed = feedparser.parse(feed_url)
+        print(f"Fetching {feed_cfg['name']}...")
+
+        # Conditional GET: send back the ETag / Last-Modified we saw last
+        # time so unchanged feeds answer 304 with an empty body
+        feed_state = state.get(feed_cfg['url'], {})
+        headers = {}
+        if feed_state.get('etag'):
+            headers['If-None-Match'] = feed_state['etag']
+        if feed_state.get('modified'):
+            headers['If-Modified-Since'] = feed_state['modified']
+
+        async with session.get(feed_cfg['url'], headers=headers) as response:
+            if response.status == 304:
+                print(f"  ✓ {feed_cfg['name']} not modified, skipping\n")
+                return []
+            response.raise_for_status()
+            state[feed_cfg['url']] = {
+                'etag': response.headers.get('ETag'),
+                'modified': response.headers.get('Last-Modified'),
+            }
+            body = await response.read()
+            content_type = response.headers.get('Content-Type', '')
+
+        # Network I/O is done above, so feedparser only parses the bytes;
+        # the content-type header lets it pick the right charset. Parsing is
+        # CPU-bound, so run it on the executor to keep the event loop free
+        feed = await asyncio.to_thread(
+            feedparser.parse, body,
+            response_headers={'content-type': content_type})
         articles = []
-        
-        for entry in feed.entries[:max_articles]:
-            article = {
-                'title': entry.get('title', 'No title'),
+
+        # Escape display-only fields here, once, so the TOC and body passes
+        # don't each have to; the link stays raw because it's also the
+        # fetch URL and gets escaped at render time. Skip stories another
+        # feed (or a recent run) already covered - this loop runs on the
+        # event loop, so checking and marking seen here is race-free
+        for entry in feed.entries[:feed_cfg['max_articles']]:
+            norm_url = normalize_url(entry.get('link', ''))
+            if norm_url and norm_url in seen:
+                print(f"    - Skipping duplicate: {entry.get('title', '')[:50]}")
+                continue
+            if norm_url:
+                seen[norm_url] = datetime.now().isoformat()
+            articles.append({
+                'title': escape(entry.get('title', 'No title')),
                 'link': entry.get('link', ''),
                 'summary': entry.get('summary', entry.get('description', '')),
-                'published': entry.get('published', 'Unknown date'),
+                'published': escape(entry.get('published', 'Unknown date')),
                 'full_content': None
-            }
-            
-            # Fetch full article content
-            if article['link']:
-                full_content = fetch_full_article(article['link'])
-                if full_content:
-                    article['full_content'] = full_content
-                    print(f"    ✓ Got full article ({len(full_content)} chars)")
-                else:
-                    print(f"    ⚠ Using summary instead")
-                
-                # Be nice to servers - small delay between requests
-                time.sleep(1)
-            
-            articles.append(article)
-        
+            })
+
+        # Fetch all full articles for this feed concurrently, each bounded
+        # by a hard timeout; a timeout just means we keep the summary
+        tasks = [
+            asyncio.wait_for(fetch_full_article(session, a['link'], cache),
+                             timeout=ARTICLE_FETCH_TIMEOUT)
+            for a in articles if a['link']
+        ]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        result_iter = iter(results)
+        for article in articles:
+            if not article['link']:
+                continue
+            full_content = next(result_iter)
+            if isinstance(full_content, Exception):
+                full_content = None
+            if full_content:
+                article['full_content'] = full_content
+                print(f"    ✓ Got full article ({len(full_content)} chars)")
+            else:
+                print(f"    ⚠ Using summary instead")
+
+        # Strip tags exactly once per article and pre-render the fragments
+        # the digest needs, so building the document is pure concatenation.
+        # Extracted full content is already plain text, only the feed
+        # summary needs stripping
+        for article in articles:
+            if article['full_content']:
+                clean_text = article['full_content'].strip()
+            else:
+                clean_text = strip_html(article['summary']).strip()
+            article['clean_text'] = clean_text
+            article['short_summary'] = escape(
+                clean_text[:150] + '...' if len(clean_text) > 150 else clean_text)
+            article['paragraphs_html'] = ''.join(
+                [f'<p>{escape(p.strip())}</p>'
+                 for p in clean_text.split('\n\n') if p.strip()]
+            ) or '<p>Content not available</p>'
+
+        print(f"  ✓ Processed {len(articles)} articles from {feed_cfg['name']}\n")
         return articles
     except Exception as e:
-        print(f"Error fetching feed {feed_url}: {e}")
+        print(f"Error fetching feed {feed_cfg['url']}: {e}")
         return []
 
-def create_html_digest(all_feeds_articles):
-    """Create an HTML document with all articles"""
-    today = datetime.now().strftime("%B %d, %Y")
-    
-    html = f"""
+# Static page header, built once at import; only the date is substituted
+# per run so the CSS isn't re-interpolated (with doubled braces) every call
+_HTML_HEAD = string.Template("""
     <!DOCTYPE html>
     <html>
     <head>
@@ -128,258 +374,324 @@ def create_html_digest(all_feeds_articles):
         <meta name="author" content="Claude AI">
         <meta name="DC.creator" content="Claude AI">
         <meta name="DC.publisher" content="Daily News Digest">
-        <title>Daily News Digest - {today}</title>
+        <title>Daily News Digest - $today</title>
         <style>
-            body {{
+            body {
                 font-family: Georgia, serif;
                 line-height: 1.6;
                 max-width: 800px;
                 margin: 0 auto;
                 padding: 20px;
-            }}
-            h1 {{
+            }
+            h1 {
                 color: #333;
                 border-bottom: 3px solid #333;
                 padding-bottom: 10px;
                 page-break-after: avoid;
-            }}
-            h2 {{
+            }
+            h2 {
                 color: #555;
                 margin-top: 40px;
                 border-bottom: 2px solid #ddd;
                 padding-bottom: 5px;
                 page-break-after: avoid;
-            }}
-            .article {{
+            }
+            .article {
                 margin-bottom: 40px;
                 padding-bottom: 20px;
                 border-bottom: 2px solid #ddd;
                 page-break-inside: avoid;
-            }}
-            .article-title {{
+            }
+            .article-title {
                 font-size: 20px;
                 font-weight: bold;
                 color: #000;
                 margin-bottom: 8px;
                 page-break-after: avoid;
-            }}
-            .article-meta {{
+            }
+            .article-meta {
                 color: #666;
                 font-size: 14px;
                 margin-bottom: 15px;
                 font-style: italic;
-            }}
-            .article-content {{
+            }
+            .article-content {
                 color: #333;
                 text-align: justify;
                 margin-bottom: 15px;
-            }}
-            .article-link {{
+            }
+            .article-link {
                 color: #0066cc;
                 text-decoration: none;
                 font-size: 14px;
                 display: block;
                 margin-top: 10px;
-            }}
-            .source-divider {{
+            }
+            .source-divider {
                 margin: 50px 0 30px 0;
                 page-break-before: always;
-            }}
-            .toc {{
+            }
+            .toc {
                 margin: 30px 0;
                 padding: 20px;
                 background-color: #f9f9f9;
                 border: 1px solid #ddd;
                 page-break-after: always;
-            }}
-            .toc h3 {{
+            }
+            .toc h3 {
                 color: #333;
                 margin-top: 20px;
                 margin-bottom: 10px;
                 font-size: 18px;
-            }}
-            .toc-item {{
+            }
+            .toc-item {
                 margin-bottom: 15px;
                 padding-bottom: 10px;
                 border-bottom: 1px solid #e0e0e0;
-            }}
-            .toc-title {{
+            }
+            .toc-title {
                 font-weight: bold;
                 color: #0066cc;
                 text-decoration: none;
                 display: block;
                 margin-bottom: 5px;
-            }}
-            .toc-title:hover {{
+            }
+            .toc-title:hover {
                 text-decoration: underline;
-            }}
-            .toc-summary {{
+            }
+            .toc-summary {
                 font-size: 14px;
                 color: #666;
                 line-height: 1.4;
-            }}
+            }
         </style>
     </head>
+""")
+
+_BODY_OPEN = string.Template("""
     <body>
         <h1>Daily News Digest</h1>
-        <p style="color: #666; font-style: italic;">{today}</p>
-    """
-    
-    # Build table of contents
-    html += '\n<div class="toc">\n<h2>Table of Contents</h2>\n'
-    
+        <p style="color: #666; font-style: italic;">$today</p>
+    """)
+
+def iter_html_digest(all_feeds_articles):
+    """Yield the digest HTML as a stream of fragments, TOC first"""
+    today = datetime.now().strftime("%B %d, %Y")
+
+    yield _HTML_HEAD.substitute(today=today) + _BODY_OPEN.substitute(today=today)
+
+    # Single pass: yield TOC entries as they're built and buffer the
+    # matching body fragments (both pre-rendered at fetch time), then
+    # flush the bodies after the TOC closes
+    yield '\n<div class="toc">\n<h2>Table of Contents</h2>\n'
+
+    body_parts = []
     article_counter = 0
-    for feed_data in all_feeds_articles:
+    for idx, feed_data in enumerate(all_feeds_articles):
         feed_name = feed_data['name']
         articles = feed_data['articles']
-        
+
         if articles:
-            html += f'<h3>{feed_name}</h3>\n'
-            
+            yield f'<h3>{feed_name}</h3>\n'
+            divider_class = 'source-divider' if idx > 0 else ''
+            body_parts.append(f'\n<h2 class="{divider_class}">{feed_name}</h2>\n')
+
             for article in articles:
                 article_counter += 1
                 article_id = f"article-{article_counter}"
-                
-                # Create short summary (first 150 chars of content)
-                content = article.get('full_content') or article.get('summary', '')
-                content = re.sub('<[^<]+?>', '', content).strip()
-                short_summary = content[:150] + '...' if len(content) > 150 else content
-                
-                html += f"""
+
+                yield f"""
                 <div class="toc-item">
                     <a href="#{article_id}" class="toc-title">{article['title']}</a>
-                    <div class="toc-summary">{short_summary}</div>
+                    <div class="toc-summary">{article['short_summary']}</div>
                 </div>
                 """
-    
-    html += '</div>\n'
-    
-    # Reset counter for article content
-    article_counter = 0
-    
-    for idx, feed_data in enumerate(all_feeds_articles):
-        feed_name = feed_data['name']
-        articles = feed_data['articles']
-        
-        if articles:
-            divider_class = 'source-divider' if idx > 0 else ''
-            html += f'\n<h2 class="{divider_class}">{feed_name}</h2>\n'
-            
-            for article in articles:
-                article_counter += 1
-                article_id = f"article-{article_counter}"
-                
-                # Use full content if available, otherwise use summary
-                content = article.get('full_content') or article.get('summary', 'Content not available')
-                
-                # Clean up content
-                content = re.sub('<[^<]+?>', '', content)
-                content = content.strip()
-                
-                # Format paragraphs
-                paragraphs = content.split('\n\n')
-                formatted_content = ''.join([f'<p>{p.strip()}</p>' for p in paragraphs if p.strip()])
-                
-                html += f"""
+
+                link = escape(article['link'], quote=True)
+                body_parts.append(f"""
                 <div class="article" id="{article_id}">
                     <div class="article-title">{article['title']}</div>
                     <div class="article-meta">{article['published']}</div>
                     <div class="article-content">
-                        {formatted_content}
+                        {article['paragraphs_html']}
                     </div>
-                    <a href="{article['link']}" class="article-link">Original article: {article['link']}</a>
+                    <a href="{link}" class="article-link">Original article: {link}</a>
                 </div>
-                """
-    
-    html += """
+                """)
+
+    yield '</div>\n'
+    yield from body_parts
+
+    yield """
     </body>
     </html>
     """
-    
-    return html
 
-def send_to_kindle(html_content, config):
+class SMTPClient:
+    """Holds one SMTP connection open and reconnects lazily if it drops"""
+
+    def __init__(self, email, password, host='smtp.gmail.com', port=465):
+        self.email = email
+        self.password = password
+        self.host = host
+        self.port = port
+        self._server = None
+
+    def _connect(self):
+        print("Connecting to email server...")
+        # SSL on connect (465) is one fewer round trip than STARTTLS on 587
+        server = smtplib.SMTP_SSL(self.host, self.port)
+        server.login(self.email, self.password)
+        self._server = server
+
+    def send(self, msg):
+        """Send a message, reusing the open connection when it's still alive"""
+        if self._server is not None:
+            try:
+                self._server.noop()
+            except (smtplib.SMTPException, OSError):
+                self._server = None
+        if self._server is None:
+            self._connect()
+        self._server.send_message(msg)
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
+
+def send_to_kindle(html_bytes, config, smtp_client):
     """Send the digest to Kindle via email with HTML attachment"""
     try:
         # Create message
-        msg = MIMEMultipart()
+        msg = EmailMessage()
         msg['From'] = config['sender_email']
         msg['To'] = config['kindle_email']
         msg['Subject'] = f"Daily News Digest - {datetime.now().strftime('%B %d, %Y')}"
-        
-        # Add a simple text body
-        body = "Your daily news digest is attached."
-        msg.attach(MIMEText(body, 'plain'))
-        
-        # Create HTML file attachment
-        filename = f"Daily News Digest {datetime.now().strftime('%d-%m-%Y')}.html"
-        
-        # Attach the HTML file
-        attachment = MIMEBase('application', 'octet-stream')
-        attachment.set_payload(html_content.encode('utf-8'))
-        encoders.encode_base64(attachment)
-        attachment.add_header('Content-Disposition', f'attachment; filename={filename}')
-        msg.attach(attachment)
-        
-        # Connect to Gmail SMTP
-        print("Connecting to email server...")
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
-        server.login(config['sender_email'], config['sender_password'])
-        
+        msg.set_content("Your daily news digest is attached.")
+
+        # Compress the HTML before attaching; the digest is mostly repeated
+        # markup so deflate shrinks it ~10x, and Send-to-Kindle unpacks zip
+        # archives on arrival
+        html_name = f"Daily News Digest {datetime.now().strftime('%d-%m-%Y')}.html"
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED, compresslevel=6) as archive:
+            archive.writestr(html_name, html_bytes)
+        filename = f"Daily News Digest {datetime.now().strftime('%d-%m-%Y')}.zip"
+
+        msg.add_attachment(buffer.getvalue(), maintype='application',
+                           subtype='zip', filename=filename)
+
         # Send email
         print(f"Sending to {config['kindle_email']}...")
-        server.send_message(msg)
-        server.quit()
-        
+        smtp_client.send(msg)
+
         print("✓ Digest sent successfully!")
         return True
-        
+
     except Exception as e:
         print(f"✗ Error sending email: {e}")
         return False
 
-def main():
+async def main_async():
     """Main function to orchestrate the digest creation and sending"""
     print(f"\n{'='*50}")
     print(f"RSS to Kindle Digest Generator")
     print(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"{'='*50}\n")
-    
+
+    # Give the executor enough threads that HTML/feed parsing overlaps
+    # with the outstanding downloads
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=8))
+
+    state = load_state()
+    seen = load_seen()
+    cache = open_article_cache()
+
+    # Fetch all feeds (and their articles) concurrently over one session:
+    # cache DNS lookups for the whole run and keep connections to busy
+    # hosts (BBC serves most of the articles) alive for reuse
+    connector = aiohttp.TCPConnector(
+        limit=50,
+        limit_per_host=8,
+        ttl_dns_cache=600,
+        use_dns_cache=True,
+        enable_cleanup_closed=True,
+    )
+    try:
+        async with aiohttp.ClientSession(
+                connector=connector,
+                headers=REQUEST_HEADERS,
+                timeout=aiohttp.ClientTimeout(total=15)) as session:
+            results = await asyncio.gather(
+                *[fetch_feed(session, feed, state, cache, seen) for feed in CONFIG['feeds']],
+                return_exceptions=True
+            )
+    finally:
+        cache.close()
+
     all_feeds_articles = []
-    
-    # Fetch articles from each feed
-    for feed in CONFIG['feeds']:
-        print(f"Fetching {feed['name']}...")
-        articles = fetch_articles(feed['url'], feed['max_articles'])
+    for feed, articles in zip(CONFIG['feeds'], results):
+        if isinstance(articles, Exception):
+            print(f"Error fetching feed {feed['url']}: {articles}")
+            articles = []
         all_feeds_articles.append({
             'name': feed['name'],
             'articles': articles
         })
-        print(f"  ✓ Processed {len(articles)} articles\n")
-    
-    # Create HTML digest
+
+    # Create HTML digest, streaming fragments straight to the preview file
+    # as they're encoded so only one full copy (the attachment bytes) is
+    # ever held in memory
     print("Creating digest...")
-    html_content = create_html_digest(all_feeds_articles)
-    
-    # Optionally save to file for testing
-    try:
-        with open('digest_preview.html', 'w', encoding='utf-8') as f:
-            f.write(html_content)
+
+    # The preview is opt-in (set WRITE_PREVIEW=1 locally); on GitHub
+    # Actions it would just encode and write megabytes that get discarded.
+    # Write via a temp file + rename so a crash never leaves half a preview
+    preview = None
+    if os.environ.get('WRITE_PREVIEW'):
+        preview = open('digest_preview.html.tmp', 'wb')
+
+    html_chunks = []
+    for piece in iter_html_digest(all_feeds_articles):
+        chunk = piece.encode('utf-8')
+        if preview:
+            preview.write(chunk)
+        html_chunks.append(chunk)
+
+    if preview:
+        preview.close()
+        os.replace('digest_preview.html.tmp', 'digest_preview.html')
         print("✓ Preview saved to digest_preview.html\n")
-    except:
-        print("(Preview file not saved - this is normal on GitHub Actions)\n")
-    
+
+    html_bytes = b''.join(html_chunks)
+
     # Send to Kindle
     print("Sending to Kindle...")
-    success = send_to_kindle(html_content, CONFIG)
-    
+    smtp_client = SMTPClient(CONFIG['sender_email'], CONFIG['sender_password'])
+    try:
+        success = send_to_kindle(html_bytes, CONFIG, smtp_client)
+    finally:
+        smtp_client.close()
+
     if success:
+        # Only persist the feed ETags and seen URLs after a successful
+        # send; otherwise a retry run would get 304 on unchanged feeds and
+        # skip every article as a "duplicate", emailing a near-empty digest
+        save_state(state)
+        save_seen(seen)
         print(f"\n{'='*50}")
         print("All done! Check your Kindle in a few minutes.")
         print(f"{'='*50}\n")
     else:
         print("\nFailed to send. Please check your email settings.")
 
+def main():
+    asyncio.run(main_async())
+
 if __name__ == "__main__":
     main()